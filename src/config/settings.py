@@ -1,10 +1,84 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields, replace
 from pathlib import Path
+from typing import Any, get_type_hints
 import os
 from dotenv import load_dotenv
 
+try:
+    import tomllib
+except ModuleNotFoundError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ModuleNotFoundError:
+        tomllib = None
+
+
+CONFIG_PATH_ENV = "AQI_CONFIG_FILE"
+DEFAULT_CONFIG_NAME = "aqi_pipeline.toml"
+ENV_PREFIX = "AQI"
+
+_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+_SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+
+@dataclass(frozen=True)
+class HTTPSettings:
+    timeout: float = 10.0
+
+
+@dataclass(frozen=True)
+class CollectorSettings:
+    # Number of cities fetched concurrently (1 = sequential)
+    max_workers: int = 1
+
+
+@dataclass(frozen=True)
+class SQLiteSettings:
+    journal_mode: str = "WAL"
+    synchronous: str = "FULL"
+    busy_timeout: float = 5.0
+    # Negative values are KiB, positive values are pages (see PRAGMA cache_size)
+    cache_size: int = -2000
+
+
+@dataclass(frozen=True)
+class ONNXSettings:
+    providers: tuple[str, ...] = ("CPUExecutionProvider",)
+    # 0 lets onnxruntime pick the thread count
+    intra_op_num_threads: int = 0
+    inter_op_num_threads: int = 0
+    # Rows per InferenceSession.run call (0 = whole matrix at once)
+    batch_size: int = 0
+
+
+@dataclass(frozen=True)
+class TrainingSettings:
+    # Parallel per-target model fits (1 = sequential, 0 = one per CPU core);
+    # only worth raising for training sets of millions of rows
+    max_workers: int = 1
+    # Rows per streamed float32 block; 0 keeps the in-memory path
+    chunk_size: int = 0
+
+
+@dataclass(frozen=True)
+class AnomalySettings:
+    enabled: bool = True
+    # |value - mean| / std above this is a spike
+    z_threshold: float = 4.0
+    # Readings needed before spike detection kicks in
+    min_samples: int = 12
+    # Identical consecutive readings that mark a sensor as stuck
+    stuck_repeats: int = 6
+    # AQI sub-indices outside [0, max_value] are physically impossible
+    max_value: float = 1000.0
+
+
+@dataclass(frozen=True)
+class PlotSettings:
+    dpi: int = 200
+
 
 @dataclass(frozen=True)
 class Settings:
@@ -17,36 +91,196 @@ class Settings:
     uci_csv_path: Path
 
     # AQICN (bonus dataset)
-    aqicn_api_token: str | None
+    aqicn_api_token: str | None = field(repr=False)
     aqicn_db_path: Path
     cities: list[str]
 
+    # Performance knobs
+    http: HTTPSettings = HTTPSettings()
+    collector: CollectorSettings = CollectorSettings()
+    sqlite: SQLiteSettings = SQLiteSettings()
+    onnx: ONNXSettings = ONNXSettings()
+    training: TrainingSettings = TrainingSettings()
+    anomaly: AnomalySettings = AnomalySettings()
+    plots: PlotSettings = PlotSettings()
+
 
-def load_settings() -> Settings:
+# TOML table name -> settings section class
+_SECTIONS: dict[str, type] = {
+    "http": HTTPSettings,
+    "collector": CollectorSettings,
+    "sqlite": SQLiteSettings,
+    "onnx": ONNXSettings,
+    "training": TrainingSettings,
+    "anomaly": AnomalySettings,
+    "plots": PlotSettings,
+}
+
+
+def _coerce(name: str, value: Any, hint: Any) -> Any:
+    """Convert a TOML or environment value to the type declared on the dataclass."""
+    try:
+        if hint is bool:
+            if isinstance(value, str):
+                lowered = value.strip().lower()
+                if lowered in {"1", "true", "yes", "on"}:
+                    return True
+                if lowered in {"0", "false", "no", "off"}:
+                    return False
+                raise ValueError(value)
+            return bool(value)
+        if hint is int:
+            if isinstance(value, float) and not value.is_integer():
+                raise ValueError(value)
+            return int(value)
+        if hint is float:
+            return float(value)
+        if hint is str:
+            return str(value).strip()
+        if hint == tuple[str, ...] or hint == list[str]:
+            if isinstance(value, str):
+                items = [v.strip() for v in value.split(",")]
+            else:
+                items = [str(v).strip() for v in value]
+            items = [v for v in items if v]
+            return tuple(items) if hint == tuple[str, ...] else items
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid value for setting '{name}': {value!r}") from e
+
+    raise TypeError(f"Unsupported settings type for '{name}': {hint}")
+
+
+def _build_section(section: str, cls: type, table: dict[str, Any]) -> Any:
+    hints = get_type_hints(cls)
+    known = {f.name for f in fields(cls)}
+
+    unknown = set(table) - known
+    if unknown:
+        raise ValueError(f"Unknown setting(s) in [{section}]: {', '.join(sorted(unknown))}")
+
+    values: dict[str, Any] = {}
+    for f in fields(cls):
+        name = f"{section}.{f.name}"
+        if f.name in table:
+            values[f.name] = _coerce(name, table[f.name], hints[f.name])
+
+        env_value = os.getenv(f"{ENV_PREFIX}_{section.upper()}_{f.name.upper()}")
+        if env_value is not None and env_value.strip():
+            values[f.name] = _coerce(name, env_value, hints[f.name])
+
+    return replace(cls(), **values)
+
+
+def _validate(settings: Settings) -> None:
+    if settings.http.timeout <= 0:
+        raise ValueError("http.timeout must be positive")
+    if settings.collector.max_workers < 1:
+        raise ValueError("collector.max_workers must be >= 1")
+    if settings.sqlite.journal_mode.upper() not in _JOURNAL_MODES:
+        raise ValueError(f"sqlite.journal_mode must be one of {sorted(_JOURNAL_MODES)}")
+    if settings.sqlite.synchronous.upper() not in _SYNCHRONOUS_MODES:
+        raise ValueError(f"sqlite.synchronous must be one of {sorted(_SYNCHRONOUS_MODES)}")
+    if settings.sqlite.busy_timeout < 0:
+        raise ValueError("sqlite.busy_timeout must be >= 0")
+    if not settings.onnx.providers:
+        raise ValueError("onnx.providers must not be empty")
+    if settings.onnx.intra_op_num_threads < 0 or settings.onnx.inter_op_num_threads < 0:
+        raise ValueError("onnx thread counts must be >= 0")
+    if settings.onnx.batch_size < 0:
+        raise ValueError("onnx.batch_size must be >= 0")
+    if settings.training.max_workers < 0:
+        raise ValueError("training.max_workers must be >= 0")
+    if settings.training.chunk_size < 0:
+        raise ValueError("training.chunk_size must be >= 0")
+    if settings.anomaly.z_threshold <= 0:
+        raise ValueError("anomaly.z_threshold must be positive")
+    if settings.anomaly.min_samples < 2:
+        raise ValueError("anomaly.min_samples must be >= 2")
+    if settings.anomaly.stuck_repeats < 2:
+        raise ValueError("anomaly.stuck_repeats must be >= 2")
+    if settings.anomaly.max_value <= 0:
+        raise ValueError("anomaly.max_value must be positive")
+    if settings.plots.dpi <= 0:
+        raise ValueError("plots.dpi must be positive")
+    if not settings.cities:
+        raise ValueError("aqicn.cities must contain at least one city")
+
+
+def _read_config_file(project_root: Path, config_path: Path | None) -> dict[str, Any]:
+    explicit = config_path or os.getenv(CONFIG_PATH_ENV)
+    path = Path(explicit) if explicit else project_root / DEFAULT_CONFIG_NAME
+
+    if not path.is_absolute():
+        path = project_root / path
+
+    if not path.exists():
+        if explicit:
+            raise FileNotFoundError(f"Settings file not found: {path}")
+        return {}
+
+    if tomllib is None:
+        raise RuntimeError("Reading TOML settings requires Python 3.11+ or the 'tomli' package")
+
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
+
+def load_settings(config_path: Path | None = None) -> Settings:
+    """
+    Build the pipeline settings.
+    Precedence (lowest -> highest): defaults, TOML file, environment variables.
+    The TOML file is `aqi_pipeline.toml` in the project root unless
+    `config_path` or $AQI_CONFIG_FILE points elsewhere.
+    """
     load_dotenv()
 
     project_root = Path(".").resolve()
-    data_dir = project_root / "data"
-    plots_dir = data_dir / "plots"
-    models_dir = data_dir / "models"
-    uci_dir = data_dir / "uci"
+    config = _read_config_file(project_root, config_path)
+
+    known_tables = set(_SECTIONS) | {"paths", "aqicn"}
+    unknown = set(config) - known_tables
+    if unknown:
+        raise ValueError(f"Unknown settings section(s): {', '.join(sorted(unknown))}")
 
-    data_dir.mkdir(exist_ok=True)
+    paths = config.get("paths", {})
+
+    def _path(key: str, default: Path) -> Path:
+        raw = os.getenv(f"{ENV_PREFIX}_PATHS_{key.upper()}") or paths.get(key)
+        if not raw:
+            return default
+        p = Path(raw).expanduser()
+        return p if p.is_absolute() else project_root / p
+
+    data_dir = _path("data_dir", project_root / "data")
+    plots_dir = _path("plots_dir", data_dir / "plots")
+    models_dir = _path("models_dir", data_dir / "models")
+    uci_csv_path = _path("uci_csv_path", data_dir / "uci" / "AirQualityUCI.csv")
+    aqicn_db_path = _path("aqicn_db_path", data_dir / "aqi_history.sqlite")
+
+    data_dir.mkdir(parents=True, exist_ok=True)
     plots_dir.mkdir(parents=True, exist_ok=True)
     models_dir.mkdir(parents=True, exist_ok=True)
-    uci_dir.mkdir(parents=True, exist_ok=True)
-
-    uci_csv_path = uci_dir / "AirQualityUCI.csv"
+    uci_csv_path.parent.mkdir(parents=True, exist_ok=True)
+    aqicn_db_path.parent.mkdir(parents=True, exist_ok=True)
 
     token = os.getenv("AQICN_API_TOKEN")
     if token:
         token = token.strip()
 
-    aqicn_db_path = data_dir / "aqi_history.sqlite"
-
+    aqicn = config.get("aqicn", {})
     cities = ["tehran", "isfahan", "mashhad", "ahvaz"]
+    if "cities" in aqicn:
+        cities = _coerce("aqicn.cities", aqicn["cities"], list[str])
+    env_cities = os.getenv(f"{ENV_PREFIX}_AQICN_CITIES")
+    if env_cities:
+        cities = _coerce("aqicn.cities", env_cities, list[str])
+
+    sections = {
+        name: _build_section(name, cls, config.get(name, {}))
+        for name, cls in _SECTIONS.items()
+    }
 
-    return Settings(
+    settings = Settings(
         project_root=project_root,
         data_dir=data_dir,
         plots_dir=plots_dir,
@@ -55,4 +289,7 @@ def load_settings() -> Settings:
         aqicn_api_token=token,
         aqicn_db_path=aqicn_db_path,
         cities=cities,
+        **sections,
     )
+    _validate(settings)
+    return settings
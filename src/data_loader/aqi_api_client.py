@@ -1,6 +1,6 @@
 import os
 import requests
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Dict, Any
 from dotenv import load_dotenv
 
@@ -8,7 +8,9 @@ class AQIAPIClient:
 
     BASE_URL = "https://api.waqi.info/feed"
 
-    def __init__(self, api_token: str = None) -> None:
+    def __init__(self, api_token: str = None, timeout: float = 10.0) -> None:
+        self.timeout = timeout
+
         if api_token:
             self.api_token = api_token  # Use provided token
         else:
@@ -22,7 +24,7 @@ class AQIAPIClient:
         url = f"{self.BASE_URL}/{city}/?token={self.api_token}"
 
         try:
-            response = requests.get(url, timeout=10)
+            response = requests.get(url, timeout=self.timeout)
             response.raise_for_status()  # This will raise an error for bad responses (4xx/5xx)
         except requests.RequestException as e:
             raise RuntimeError(f"Network/API error for city '{city}'") from e
@@ -46,5 +48,27 @@ class AQIAPIClient:
             "no2": iaqi.get("no2", {}).get("v"),
             "so2": iaqi.get("so2", {}).get("v"),
             "o3": iaqi.get("o3", {}).get("v"),
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": self._station_time(raw),
         }
+
+    @staticmethod
+    def _station_time(raw: Dict[str, Any]) -> str:
+        """
+        Measurement time reported by the station, as a naive UTC ISO string.
+        Falls back to the fetch time when the feed carries no usable time.
+        """
+        t = raw.get("time") or {}
+
+        # "iso" is e.g. "2024-01-01T12:00:00+03:30"; "s" is local time with a separate "tz"
+        text = t.get("iso") or (f"{t['s']}{t.get('tz') or ''}" if t.get("s") else None)
+
+        if text:
+            try:
+                parsed = datetime.fromisoformat(text)
+                if parsed.tzinfo is not None:
+                    parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+                return parsed.isoformat()
+            except ValueError:
+                pass
+
+        return datetime.utcnow().isoformat()
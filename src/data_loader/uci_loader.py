@@ -1,11 +1,25 @@
 from __future__ import annotations
 
 from pathlib import Path
+from typing import Iterator
+import numpy as np
 import pandas as pd
 
 
 UCI_MISSING_SENTINEL = -200
 
+# Ground-truth (reference analyser) targets
+UCI_TARGETS = ["CO(GT)", "NMHC(GT)", "C6H6(GT)", "NOx(GT)", "NO2(GT)"]
+
+# Metal-oxide sensor responses shared by every target model
+UCI_SENSOR_FEATURES = [
+    "PT08.S1(CO)",
+    "PT08.S2(NMHC)",
+    "PT08.S3(NOx)",
+    "PT08.S4(NO2)",
+    "PT08.S5(O3)",
+]
+
 
 def load_uci_air_quality(csv_path: Path) -> pd.DataFrame:
     # Load UCI Air Quality dataset and create a Datetime column.
@@ -27,16 +41,56 @@ def load_uci_air_quality(csv_path: Path) -> pd.DataFrame:
     return df
 
 
-def preprocess_uci_for_co_regression(df: pd.DataFrame) -> pd.DataFrame:
-    work = df.copy()
-
-    for col in ["CO(GT)", "PT08.S1(CO)"]:
-        work[col] = pd.to_numeric(work[col], errors="coerce")
+def preprocess_uci_for_multi_target(
+    df: pd.DataFrame,
+    targets: list[str] = UCI_TARGETS,
+    features: list[str] = UCI_SENSOR_FEATURES,
+) -> pd.DataFrame:
+    """
+    Keep rows with all sensor features present.
+    Targets may still be NaN; each target model drops its own missing rows.
+    """
+    work = df[features + targets].apply(pd.to_numeric, errors="coerce")
 
     # Replace sentinel values (-200) with NaN
-    work = work.replace(UCI_MISSING_SENTINEL, pd.NA)
+    work = work.mask(work == UCI_MISSING_SENTINEL, np.nan)
 
-    # Drop rows with missing target or feature
-    work = work.dropna(subset=["CO(GT)", "PT08.S1(CO)"])
+    work = work.dropna(subset=features).reset_index(drop=True)
 
     return work
+
+
+def iter_uci_blocks(
+    csv_path: Path,
+    chunk_size: int,
+    targets: list[str] = UCI_TARGETS,
+    features: list[str] = UCI_SENSOR_FEATURES,
+) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    """
+    Stream the UCI CSV as float32 (X, Y) blocks of at most `chunk_size` rows.
+    Only feature/target columns are parsed; the full file is never in memory.
+    Malformed cells become NaN (as pd.to_numeric(errors="coerce") does in the
+    in-memory path); rows with any missing feature are dropped, missing targets stay NaN.
+    """
+    cols = features + targets
+    reader = pd.read_csv(
+        csv_path,
+        sep=";",
+        usecols=cols,
+        dtype=str,
+        chunksize=chunk_size,
+    )
+
+    for chunk in reader:
+        # Decimal comma handled here, since dtype=str bypasses read_csv's own parsing;
+        # the -200 sentinel becomes NaN in the same pass
+        numeric = chunk[cols].apply(
+            lambda c: pd.to_numeric(c.str.replace(",", ".", regex=False), errors="coerce")
+        )
+        block = numeric.mask(numeric == UCI_MISSING_SENTINEL).to_numpy(dtype=np.float32)
+
+        X = block[:, :len(features)]
+        keep = ~np.isnan(X).any(axis=1)
+        if not keep.all():
+            block = block[keep]
+        yield block[:, :len(features)], block[:, len(features):]
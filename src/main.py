@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import argparse
 import logging
+from pathlib import Path
 
 from src.config.settings import load_settings
 from src.pipeline.uci_runner import run_uci_pipeline
@@ -15,20 +16,30 @@ logger = logging.getLogger("pip")
 def build_parser() -> argparse.ArgumentParser:
     p = argparse.ArgumentParser(description="AQI Pipeline (UCI core + AQICN bonus)")
     p.add_argument("--mode", choices=["uci", "aqicn"], default="uci", help="Execution mode")
+    p.add_argument("--config", type=Path, default=None, help="Path to a TOML settings file")
+    p.add_argument(
+        "--train-aqicn",
+        action="store_true",
+        help="In aqicn mode, also train and export the AQI model from the SQLite history",
+    )
     return p
 
 
 
 def main() -> None:
-    settings = load_settings()
     args = build_parser().parse_args()
-    print(f"AQICN API token: {settings.aqicn_api_token}")
+    settings = load_settings(args.config)
+    logger.info("AQICN API token: %s", "configured" if settings.aqicn_api_token else "missing")
     try:
         if args.mode == "uci":
             run_uci_pipeline(
                 uci_csv=settings.uci_csv_path,
-                onnx_out=settings.models_dir / "uci_co_model.onnx",
+                onnx_out=settings.models_dir / "uci_multi_target_model.onnx",
                 plot_out=settings.plots_dir / "uci_actual_vs_pred.png",
+                onnx_settings=settings.onnx,
+                dpi=settings.plots.dpi,
+                max_workers=settings.training.max_workers,
+                chunk_size=settings.training.chunk_size,
             )
         else:
             run_aqicn_pipeline(
@@ -36,6 +47,14 @@ def main() -> None:
                 db_path=settings.aqicn_db_path,
                 plots_dir=settings.plots_dir,
                 cities=settings.cities,
+                timeout=settings.http.timeout,
+                max_workers=settings.collector.max_workers,
+                sqlite_settings=settings.sqlite,
+                anomaly_settings=settings.anomaly,
+                dpi=settings.plots.dpi,
+                model_out=settings.models_dir / "aqicn_model.onnx" if args.train_aqicn else None,
+                onnx_settings=settings.onnx,
+                chunk_size=settings.training.chunk_size,
             )
 
     except Exception as e:
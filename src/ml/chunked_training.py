@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator
+
+import numpy as np
+from sklearn.linear_model import LinearRegression
+
+from src.config.settings import ONNXSettings
+from src.ml.onnx_session import create_session, predict
+
+
+# A block is (X, Y): float32 features (n, p) and float32 targets (n, k), NaN = missing target
+Block = tuple[np.ndarray, np.ndarray]
+BlockSource = Callable[[], Iterator[Block]]
+
+
+class NormalEquationAccumulator:
+    """
+    Out-of-core least squares on mean-centred data.
+
+    Per target it keeps the row count, feature/target means and the centred
+    co-moments Sxx = sum((x - mean_x)(x - mean_x)^T) and Sxy = sum((x - mean_x)(y - mean_y)).
+    Each block is centred on its own means and merged with the pairwise update of
+    Chan et al., so the raw (~1e3, highly correlated) features are never squared
+    uncentred. Solving Sxx b = Sxy and setting intercept = mean_y - b . mean_x gives
+    the same model as LinearRegression.fit on the full data, in O(p^2) memory.
+    """
+
+    def __init__(self, n_features: int, n_targets: int) -> None:
+        self.n_features = n_features
+        self.n_targets = n_targets
+        # float64 accumulators: the blocks are float32 but the sums grow large
+        self.counts = np.zeros(n_targets, dtype=np.int64)
+        self.mean_x = np.zeros((n_targets, n_features))
+        self.mean_y = np.zeros(n_targets)
+        self.sxx = np.zeros((n_targets, n_features, n_features))
+        self.sxy = np.zeros((n_targets, n_features))
+
+    def partial_fit(self, X: np.ndarray, Y: np.ndarray) -> None:
+        if len(X) == 0:
+            return
+
+        for t in range(self.n_targets):
+            # Each target has its own missing rows
+            mask = ~np.isnan(Y[:, t])
+            nb = int(mask.sum())
+            if nb == 0:
+                continue
+
+            Xb = X[mask].astype(float)
+            yb = Y[mask, t].astype(float)
+            mxb = Xb.mean(axis=0)
+            myb = yb.mean()
+            Xb -= mxb
+            yb -= myb
+
+            n = self.counts[t]
+            total = n + nb
+            dx = mxb - self.mean_x[t]
+            dy = myb - self.mean_y[t]
+            weight = n * nb / total
+
+            self.sxx[t] += Xb.T @ Xb + weight * np.outer(dx, dx)
+            self.sxy[t] += Xb.T @ yb + weight * dx * dy
+            self.mean_x[t] += dx * nb / total
+            self.mean_y[t] += dy * nb / total
+            self.counts[t] = total
+
+    def to_model(self) -> LinearRegression:
+        if (self.counts == 0).any():
+            raise ValueError("At least one target has no training rows")
+
+        # lstsq instead of solve: tolerates collinear / constant features like LinearRegression
+        coef = np.vstack([
+            np.linalg.lstsq(self.sxx[t], self.sxy[t], rcond=None)[0]
+            for t in range(self.n_targets)
+        ])
+        intercept = self.mean_y - np.einsum("tp,tp->t", coef, self.mean_x)
+
+        model = LinearRegression()
+        if self.n_targets == 1:
+            model.coef_ = coef[0]
+            model.intercept_ = float(intercept[0])
+        else:
+            model.coef_ = coef
+            model.intercept_ = intercept
+        model.n_features_in_ = self.n_features
+        return model
+
+
+@dataclass
+class ChunkedEvaluation:
+    mae: list[float]
+    # Bounded uniform sample of test rows (actual, predicted) for plotting
+    y_true_sample: np.ndarray
+    y_pred_sample: np.ndarray
+
+
+class _Reservoir:
+    """Uniform fixed-size sample over a stream of row blocks (Algorithm R, vectorized)."""
+
+    def __init__(self, size: int, n_cols: int, seed: int) -> None:
+        self.size = size
+        self.seen = 0
+        self.rng = np.random.default_rng(seed)
+        self.true = np.empty((size, n_cols), dtype=np.float32)
+        self.pred = np.empty((size, n_cols), dtype=np.float32)
+
+    def add(self, y_true: np.ndarray, y_pred: np.ndarray) -> None:
+        if self.size == 0:
+            return
+
+        m = len(y_true)
+        fill = min(max(self.size - self.seen, 0), m)
+        if fill:
+            self.true[self.seen:self.seen + fill] = y_true[:fill]
+            self.pred[self.seen:self.seen + fill] = y_pred[:fill]
+
+        if fill < m:
+            # Row with global index j replaces slot r ~ U{0..j} when r < size;
+            # fancy assignment keeps the last write, matching sequential order.
+            j = np.arange(self.seen + fill, self.seen + m)
+            r = (self.rng.random(len(j)) * (j + 1)).astype(np.int64)
+            keep = r < self.size
+            self.true[r[keep]] = y_true[fill:][keep]
+            self.pred[r[keep]] = y_pred[fill:][keep]
+
+        self.seen += m
+
+    def sample(self) -> tuple[np.ndarray, np.ndarray]:
+        n = min(self.seen, self.size)
+        return self.true[:n], self.pred[:n]
+
+
+def _test_masks(source: BlockSource, test_size: float, seed: int) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    # Same seed + same row sequence -> identical train/test split on every pass,
+    # whatever the block size (the generator's stream does not depend on how it is chunked)
+    rng = np.random.default_rng(seed)
+    for X, Y in source():
+        yield X, Y, rng.random(len(X)) < test_size
+
+
+def fit_chunked(
+    source: BlockSource,
+    n_features: int,
+    n_targets: int,
+    test_size: float = 0.2,
+    seed: int = 42,
+) -> LinearRegression:
+    """Single streaming pass over the training rows."""
+    acc = NormalEquationAccumulator(n_features, n_targets)
+    for X, Y, is_test in _test_masks(source, test_size, seed):
+        train = ~is_test
+        acc.partial_fit(X[train], Y[train])
+    return acc.to_model()
+
+
+def evaluate_onnx_chunked(
+    source: BlockSource,
+    onnx_path: Path,
+    n_targets: int,
+    onnx_settings: ONNXSettings = ONNXSettings(),
+    test_size: float = 0.2,
+    seed: int = 42,
+    sample_size: int = 50_000,
+) -> ChunkedEvaluation:
+    """
+    Second streaming pass: score the held-out rows block by block with onnxruntime
+    and accumulate per-target absolute error.
+    """
+    sess = create_session(
+        onnx_path,
+        providers=onnx_settings.providers,
+        intra_op_num_threads=onnx_settings.intra_op_num_threads,
+        inter_op_num_threads=onnx_settings.inter_op_num_threads,
+    )
+
+    abs_err = np.zeros(n_targets)
+    counts = np.zeros(n_targets, dtype=np.int64)
+    reservoir = _Reservoir(sample_size, n_targets, seed + 1)
+
+    for X, Y, is_test in _test_masks(source, test_size, seed):
+        if not is_test.any():
+            continue
+        X_test = X[is_test]
+        Y_test = Y[is_test]
+        preds = predict(sess, X_test, onnx_settings.batch_size).reshape(len(X_test), n_targets)
+
+        err = np.abs(preds - Y_test)
+        valid = ~np.isnan(Y_test)
+        abs_err += np.where(valid, err, 0.0).sum(axis=0)
+        counts += valid.sum(axis=0)
+
+        reservoir.add(Y_test, preds)
+
+    if (counts == 0).any():
+        raise ValueError("At least one target has no test rows")
+
+    y_true_sample, y_pred_sample = reservoir.sample()
+    return ChunkedEvaluation(
+        mae=list(abs_err / counts),
+        y_true_sample=y_true_sample,
+        y_pred_sample=y_pred_sample,
+    )
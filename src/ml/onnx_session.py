@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+import onnxruntime as ort
+from skl2onnx import convert_sklearn
+from skl2onnx.common.data_types import FloatTensorType
+
+
+def export_sklearn_onnx(model, out_path: Path) -> None:
+    """Convert a fitted sklearn model with a float32 [None, n_features] input and write it."""
+    initial_type = [("float_input", FloatTensorType([None, model.n_features_in_]))]
+    onnx_model = convert_sklearn(model, initial_types=initial_type)
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_bytes(onnx_model.SerializeToString())
+
+
+def create_session(
+    model_path: Path,
+    providers: Sequence[str] = ("CPUExecutionProvider",),
+    intra_op_num_threads: int = 0,
+    inter_op_num_threads: int = 0,
+) -> ort.InferenceSession:
+    """
+    Create an onnxruntime session with explicit provider and thread settings.
+    Thread counts of 0 keep onnxruntime's own defaults.
+    """
+    opts = ort.SessionOptions()
+    opts.intra_op_num_threads = intra_op_num_threads
+    opts.inter_op_num_threads = inter_op_num_threads
+    return ort.InferenceSession(str(model_path), sess_options=opts, providers=list(providers))
+
+
+def predict(sess: ort.InferenceSession, X: np.ndarray, batch_size: int = 0) -> np.ndarray:
+    """
+    Run the first model output over X, optionally in fixed-size row batches.
+    """
+    input_name = sess.get_inputs()[0].name
+    X = np.ascontiguousarray(X, dtype=np.float32)
+
+    if batch_size <= 0 or len(X) <= batch_size:
+        return sess.run(None, {input_name: X})[0]
+
+    parts = [
+        sess.run(None, {input_name: X[start:start + batch_size]})[0]
+        for start in range(0, len(X), batch_size)
+    ]
+    return np.concatenate(parts, axis=0)
@@ -1,19 +1,24 @@
 from __future__ import annotations
 
+import logging
+from functools import partial
 from pathlib import Path
+from typing import Iterator
 import sqlite3
-import pandas as pd
 import numpy as np
+import pandas as pd
 
 from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import mean_absolute_error
 
-from skl2onnx import convert_sklearn
-from skl2onnx.common.data_types import FloatTensorType
-import onnxruntime as ort
+from src.config.settings import ONNXSettings
+from src.ml.chunked_training import evaluate_onnx_chunked, fit_chunked
+from src.ml.onnx_session import create_session, export_sklearn_onnx, predict
 
 
+logger = logging.getLogger(__name__)
+
 FEATURE_COLS = ["pm25", "pm10", "co", "no2", "so2", "o3"]
 TARGET_COL = "aqi"
 
@@ -25,6 +30,27 @@ def load_aqicn_dataframe(db_path: Path) -> pd.DataFrame:
     return df
 
 
+def iter_aqicn_blocks(db_path: Path, chunk_size: int) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    """
+    Stream aqi_readings as float32 (X, Y) blocks straight from a SQLite cursor.
+    Rows with a missing feature or target are dropped, like preprocess_aqicn.
+    """
+    cols = ", ".join(FEATURE_COLS + [TARGET_COL])
+    conn = sqlite3.connect(db_path)
+    try:
+        cur = conn.execute(f"SELECT {cols} FROM aqi_readings ORDER BY id")
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            # None -> NaN in the float conversion
+            block = np.array(rows, dtype=np.float32)
+            block = block[~np.isnan(block).any(axis=1)]
+            yield block[:, :len(FEATURE_COLS)], block[:, len(FEATURE_COLS):]
+    finally:
+        conn.close()
+
+
 def preprocess_aqicn(df: pd.DataFrame) -> pd.DataFrame:
     work = df.copy()
 
@@ -38,7 +64,12 @@ def preprocess_aqicn(df: pd.DataFrame) -> pd.DataFrame:
 def train_and_export_aqicn_model(
     db_path: Path,
     onnx_out: Path,
+    onnx_settings: ONNXSettings = ONNXSettings(),
+    chunk_size: int = 0,
 ) -> float:
+    if chunk_size > 0:
+        return _train_and_export_aqicn_model_chunked(db_path, onnx_out, onnx_settings, chunk_size)
+
     df = load_aqicn_dataframe(db_path)
     df = preprocess_aqicn(df)
 
@@ -56,20 +87,35 @@ def train_and_export_aqicn_model(
     mae = mean_absolute_error(y_test, preds)
 
     # Export ONNX
-    initial_type = [("float_input", FloatTensorType([None, X.shape[1]]))]
-    onnx_model = convert_sklearn(model, initial_types=initial_type)
-
-    onnx_out.parent.mkdir(parents=True, exist_ok=True)
-    onnx_out.write_bytes(onnx_model.SerializeToString())
+    export_sklearn_onnx(model, onnx_out)
 
     # Test ONNXRuntime
-    sess = ort.InferenceSession(str(onnx_out), providers=["CPUExecutionProvider"])
-    input_name = sess.get_inputs()[0].name
-    onnx_preds = sess.run(None, {input_name: X_test.to_numpy().astype(np.float32)})[0]
+    sess = create_session(
+        onnx_out,
+        providers=onnx_settings.providers,
+        intra_op_num_threads=onnx_settings.intra_op_num_threads,
+        inter_op_num_threads=onnx_settings.inter_op_num_threads,
+    )
+    onnx_preds = predict(sess, X_test.to_numpy(), onnx_settings.batch_size)
+
+    # The caller reports the onnxruntime MAE that is returned
+    logger.info("AQICN MAE (sklearn): %.2f", mae)
+
+    return mean_absolute_error(y_test.to_numpy(), onnx_preds)
+
+
+def _train_and_export_aqicn_model_chunked(
+    db_path: Path,
+    onnx_out: Path,
+    onnx_settings: ONNXSettings,
+    chunk_size: int,
+) -> float:
+    # Bounded-memory path: two streaming passes (fit, then ONNX evaluation)
+    source = partial(iter_aqicn_blocks, db_path, chunk_size)
 
-    mae_onnx = mean_absolute_error(y_test.to_numpy(), onnx_preds)
+    model = fit_chunked(source, n_features=len(FEATURE_COLS), n_targets=1)
 
-    print(f"AQICN MAE (sklearn): {mae:.2f}")
-    print(f"AQICN MAE (onnxruntime): {mae_onnx:.2f}")
+    export_sklearn_onnx(model, onnx_out)
 
-    return mae_onnx
+    result = evaluate_onnx_chunked(source, onnx_out, n_targets=1, onnx_settings=onnx_settings, sample_size=0)
+    return result.mae[0]
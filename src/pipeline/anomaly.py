@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import math
+from typing import Iterable
+
+from src.config.settings import AnomalySettings
+from src.storage.sqlite_storage import AQIRecord, AnomalyFlag, PollutantStats
+
+
+POLLUTANTS = ["aqi", "pm25", "pm10", "co", "no2", "so2", "o3"]
+
+
+def update_stats(stats: PollutantStats, value: float, timestamp: str) -> None:
+    """Welford update of the running mean/variance in O(1)."""
+    stats.count += 1
+    delta = value - stats.mean
+    stats.mean += delta / stats.count
+    stats.m2 += delta * (value - stats.mean)
+
+    if stats.last_value is not None and value == stats.last_value:
+        stats.repeat_count += 1
+    else:
+        stats.repeat_count = 1
+    stats.last_value = value
+    stats.updated_at = timestamp
+
+
+def stddev(stats: PollutantStats) -> float:
+    if stats.count < 2:
+        return 0.0
+    return math.sqrt(stats.m2 / (stats.count - 1))
+
+
+class AnomalyDetector:
+    """
+    Streaming spike / stuck-sensor / impossible-value detector.
+    State is one PollutantStats per (city, pollutant), so memory and
+    per-reading cost stay constant regardless of history length.
+    """
+
+    def __init__(
+        self,
+        state: dict[tuple[str, str], PollutantStats] | None = None,
+        settings: AnomalySettings = AnomalySettings(),
+    ) -> None:
+        self.state = state if state is not None else {}
+        self.settings = settings
+        self._touched: set[tuple[str, str]] = set()
+
+    def observe(self, city: str, pollutant: str, value: float | None, timestamp: str) -> list[AnomalyFlag]:
+        """
+        Check one reading and fold it into the running statistics.
+        `timestamp` is the station measurement time; a reading not newer than
+        the last one seen for this stream is a re-poll of the same
+        measurement and is ignored.
+        """
+        if value is None or math.isnan(value):
+            return []
+
+        key = (city, pollutant)
+        stats = self.state.get(key)
+        if stats is None:
+            stats = self.state[key] = PollutantStats(city=city, pollutant=pollutant)
+
+        if stats.updated_at is not None and timestamp <= stats.updated_at:
+            return []
+
+        if value < 0 or value > self.settings.max_value or math.isinf(value):
+            # Impossible readings are flagged but kept out of the statistics
+            stats.updated_at = timestamp
+            self._touched.add(key)
+            return [AnomalyFlag(city, pollutant, "impossible", value, None, timestamp)]
+
+        flags: list[AnomalyFlag] = []
+
+        std = stddev(stats)
+        if stats.count >= self.settings.min_samples and std > 0:
+            z = abs(value - stats.mean) / std
+            if z > self.settings.z_threshold:
+                flags.append(AnomalyFlag(city, pollutant, "spike", value, z, timestamp))
+
+        update_stats(stats, value, timestamp)
+        self._touched.add(key)
+
+        # Flag once when the run reaches the threshold, not on every later reading
+        if stats.repeat_count == self.settings.stuck_repeats:
+            flags.append(
+                AnomalyFlag(city, pollutant, "stuck", value, float(stats.repeat_count), timestamp)
+            )
+
+        return flags
+
+    def process(self, records: Iterable[AQIRecord]) -> list[AnomalyFlag]:
+        flags: list[AnomalyFlag] = []
+        for r in records:
+            for pollutant in POLLUTANTS:
+                flags.extend(self.observe(r.city, pollutant, getattr(r, pollutant), r.timestamp))
+        return flags
+
+    def changed_stats(self) -> list[PollutantStats]:
+        """Statistics updated since the detector was created (for persistence)."""
+        return [self.state[k] for k in sorted(self._touched)]
+
+
+def detect_anomalies(
+    stats: dict[tuple[str, str], PollutantStats],
+    records: list[AQIRecord],
+    settings: AnomalySettings = AnomalySettings(),
+) -> tuple[list[PollutantStats], list[AnomalyFlag]]:
+    """Detection step for SQLiteStorage.insert_with_anomalies."""
+    detector = AnomalyDetector(stats, settings)
+    flags = detector.process(records)
+    return detector.changed_stats(), flags
@@ -1,26 +1,66 @@
+from src.config.settings import AnomalySettings, ONNXSettings, SQLiteSettings
 from src.data_loader.aqi_api_client import AQIAPIClient
+from src.ml.train_aqicn_model import train_and_export_aqicn_model
+from src.pipeline.anomaly import detect_anomalies
 from src.pipeline.collector import collect_records
 from src.storage.sqlite_storage import SQLiteStorage
 from src.visualization.plots import PlotService
+from functools import partial
+from pathlib import Path
 import logging
 
 logger = logging.getLogger(__name__)
 
-def run_aqicn_pipeline(api_token: str, db_path: str, plots_dir: str, cities: list[str]) -> None:
+def run_aqicn_pipeline(
+    api_token: str,
+    db_path: str,
+    plots_dir: str,
+    cities: list[str],
+    timeout: float = 10.0,
+    max_workers: int = 1,
+    sqlite_settings: SQLiteSettings = SQLiteSettings(),
+    anomaly_settings: AnomalySettings = AnomalySettings(),
+    dpi: int = 200,
+    model_out: Path | None = None,
+    onnx_settings: ONNXSettings = ONNXSettings(),
+    chunk_size: int = 0,
+) -> None:
     if not api_token:
         raise RuntimeError("AQICN_API_TOKEN is missing. AQICN mode requires a valid token in .env")
 
-    client = AQIAPIClient(api_token=api_token)  # Initialize API client
-    storage = SQLiteStorage(db_path)  # Initialize SQLite storage
+    client = AQIAPIClient(api_token=api_token, timeout=timeout)  # Initialize API client
+    storage = SQLiteStorage(db_path, sqlite_settings)  # Initialize SQLite storage
 
-    result = collect_records(client, cities)  # Collect AQI data
+    result = collect_records(client, cities, max_workers=max_workers)  # Collect AQI data
 
     for e in result.errors:
         logger.warning("Collector error: %s", e)
 
-    inserted = storage.insert_many(result.records)
+    if anomaly_settings.enabled:
+        # Incremental detection: only the persisted running stats are loaded, never history.
+        # Readings, stats and flags are written in a single transaction.
+        inserted, flags = storage.insert_with_anomalies(
+            result.records, partial(detect_anomalies, settings=anomaly_settings)
+        )
+    else:
+        inserted, flags = storage.insert_many(result.records), []
     logger.info("Inserted %d rows into SQLite: %s", inserted, db_path)
 
+    for f in flags:
+        logger.warning(
+            "Anomaly (%s) for %s/%s: value=%s score=%s at %s",
+            f.kind, f.city, f.pollutant, f.value, f.score, f.timestamp,
+        )
+
+    if model_out is not None:
+        # Optional: retrain the AQI model on the full history (chunked when chunk_size > 0)
+        try:
+            mae = train_and_export_aqicn_model(db_path, model_out, onnx_settings, chunk_size)
+            logger.info("AQICN model exported: %s (MAE %.2f)", model_out, mae)
+        except ValueError as e:
+            # Too little complete history yet (e.g. first runs); collection still succeeds
+            logger.warning("Skipping AQICN model training: %s", e)
+
     latest = storage.fetch_latest_per_city()  # Fetch the latest data
 
     # Ensure that 'aqi' column is in the dataframe before plotting
@@ -31,7 +71,7 @@ def run_aqicn_pipeline(api_token: str, db_path: str, plots_dir: str, cities: lis
         else:
             logger.info(f"AQI data for {record.get('city')}: {record.get('aqi')}")  # Log the AQI data
 
-    result = collect_records(client, cities)
+    result = collect_records(client, cities, max_workers=max_workers)
 
     for e in result.errors:
         logger.warning("Collector error: %s", e)
@@ -40,7 +80,7 @@ def run_aqicn_pipeline(api_token: str, db_path: str, plots_dir: str, cities: lis
         logger.error("No AQICN data collected. Skipping plotting.")
         return
 
-    plotter = PlotService(plots_dir)  # Initialize PlotService
+    plotter = PlotService(plots_dir, dpi=dpi)  # Initialize PlotService
 
     # Save the latest AQI bar plot
     out = plotter.plot_latest_aqi_bar(latest, filename="latest_aqi.png")
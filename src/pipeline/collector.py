@@ -1,4 +1,5 @@
 from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional
@@ -22,30 +23,43 @@ def _to_float(x) -> Optional[float]:
         return None
 
 
-def collect_records(client, cities: list[str]) -> CollectorResult:
+def _fetch_record(client, city: str) -> AQIRecord:
+    d = client.fetch_city_aqi(city)
+    return AQIRecord(
+        city=city,
+        aqi=_to_float(d.get("aqi")),
+        pm25=_to_float(d.get("pm25")),
+        pm10=_to_float(d.get("pm10")),
+        co=_to_float(d.get("co")),
+        no2=_to_float(d.get("no2")),
+        so2=_to_float(d.get("so2")),
+        o3=_to_float(d.get("o3")),
+        timestamp=d.get("timestamp") or datetime.utcnow().isoformat(),
+    )
+
+
+def collect_records(client, cities: list[str], max_workers: int = 1) -> CollectorResult:
     """
     Collect one snapshot for multiple cities.
     `client` is expected to have: fetch_city_aqi(city)->dict
+    With max_workers > 1 cities are fetched concurrently; result order follows `cities`.
     """
     records: list[AQIRecord] = []
     errors: list[str] = []
 
+    if max_workers > 1 and len(cities) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(cities))) as pool:
+            futures = [(city, pool.submit(_fetch_record, client, city)) for city in cities]
+            for city, fut in futures:
+                try:
+                    records.append(fut.result())
+                except Exception as e:
+                    errors.append(f"{city}: {e}")
+        return CollectorResult(records=records, errors=errors)
+
     for city in cities:
         try:
-            d = client.fetch_city_aqi(city)
-            records.append(
-                AQIRecord(
-                    city=city,
-                    aqi=_to_float(d.get("aqi")),
-                    pm25=_to_float(d.get("pm25")),
-                    pm10=_to_float(d.get("pm10")),
-                    co=_to_float(d.get("co")),
-                    no2=_to_float(d.get("no2")),
-                    so2=_to_float(d.get("so2")),
-                    o3=_to_float(d.get("o3")),
-                    timestamp=d.get("timestamp") or datetime.utcnow().isoformat(),
-                )
-            )
+            records.append(_fetch_record(client, city))
         except Exception as e:
             errors.append(f"{city}: {e}")
 
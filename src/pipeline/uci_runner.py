@@ -1,17 +1,23 @@
 from __future__ import annotations
 
 import logging
+from functools import partial
 from pathlib import Path
 
 import numpy as np
-import onnxruntime as ort
 from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_absolute_error
-from skl2onnx import convert_sklearn
-from skl2onnx.common.data_types import FloatTensorType
 
-from src.data_loader.uci_loader import load_uci_air_quality, preprocess_uci_for_co_regression
+from src.config.settings import ONNXSettings
+from src.data_loader.uci_loader import (
+    UCI_SENSOR_FEATURES,
+    UCI_TARGETS,
+    iter_uci_blocks,
+    load_uci_air_quality,
+    preprocess_uci_for_multi_target,
+)
+from src.ml.chunked_training import evaluate_onnx_chunked, fit_chunked
+from src.ml.onnx_session import create_session, export_sklearn_onnx, predict
+from src.ml.train_uci_model import fit_uci_target_models, masked_mae
 from src.visualization.uci_plots import (
     plot_actual_vs_predicted,
     plot_error_histogram,
@@ -21,78 +27,146 @@ from src.visualization.uci_plots import (
 logger = logging.getLogger(__name__)
 
 
+def _target_slug(target: str) -> str:
+    # "NOx(GT)" -> "nox"
+    return target.split("(")[0].lower()
+
+
 def run_uci_pipeline(
     uci_csv: Path,
     onnx_out: Path,
     plot_out: Path,
+    onnx_settings: ONNXSettings = ONNXSettings(),
+    dpi: int = 200,
+    max_workers: int = 1,
+    chunk_size: int = 0,
 ) -> None:
     """
     UCI Core pipeline required by the course:
     Load -> Preprocess -> Train -> Evaluate -> Export ONNX -> Load ONNX (onnxruntime) -> Predict -> Plot
+    One model is trained per ground-truth pollutant and all of them are
+    exported as a single multi-output ONNX graph.
+    chunk_size > 0 switches to the out-of-core path for CSVs larger than memory.
     """
     if not uci_csv.exists():
         raise FileNotFoundError(f"UCI dataset not found: {uci_csv}")
 
+    if chunk_size > 0:
+        _run_uci_pipeline_chunked(uci_csv, onnx_out, plot_out, onnx_settings, dpi, chunk_size)
+        return
+
     # 1) Load + preprocess
     raw = load_uci_air_quality(uci_csv)
-    df = preprocess_uci_for_co_regression(raw)
+    df = preprocess_uci_for_multi_target(raw)
 
-    # 2) Features/target (simple baseline, explainable)
-    X = df[["PT08.S1(CO)"]].astype(float)
-    y = df["CO(GT)"].astype(float)
+    # 2) Features/targets (shared sensor inputs, one column per pollutant)
+    X = df[UCI_SENSOR_FEATURES].to_numpy(dtype=float)
+    Y = df[UCI_TARGETS].to_numpy(dtype=float)
 
-    # 3) Split
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42
+    # 3) Split (one split shared by every target so a single ONNX call scores them all)
+    X_train, X_test, Y_train, Y_test = train_test_split(
+        X, Y, test_size=0.2, random_state=42
     )
 
-    # 4) Train sklearn model
-    model = LinearRegression()
-    model.fit(X_train, y_train)
+    # 4) Train one sklearn model per target
+    merged = fit_uci_target_models(X_train, Y_train, UCI_TARGETS, max_workers)
 
     # 5) Evaluate sklearn
-    sk_preds = model.predict(X_test)
-    mae_sklearn = mean_absolute_error(y_test, sk_preds)
-    logger.info("UCI MAE (sklearn): %.4f", mae_sklearn)
+    sk_preds = merged.predict(X_test)
+    for i, target in enumerate(UCI_TARGETS):
+        logger.info("UCI %s MAE (sklearn): %.4f", target, masked_mae(Y_test[:, i], sk_preds[:, i]))
 
     # 6) Export to ONNX
-    initial_type = [("float_input", FloatTensorType([None, X.shape[1]]))]
-    onnx_model = convert_sklearn(model, initial_types=initial_type)
-
-    onnx_out.parent.mkdir(parents=True, exist_ok=True)
-    onnx_out.write_bytes(onnx_model.SerializeToString())
+    export_sklearn_onnx(merged, onnx_out)
     logger.info("ONNX exported: %s", onnx_out)
 
     # 7) Load & Predict using onnxruntime (explicit course requirement)
-    sess = ort.InferenceSession(str(onnx_out), providers=["CPUExecutionProvider"])
-    input_name = sess.get_inputs()[0].name
+    sess = create_session(
+        onnx_out,
+        providers=onnx_settings.providers,
+        intra_op_num_threads=onnx_settings.intra_op_num_threads,
+        inter_op_num_threads=onnx_settings.inter_op_num_threads,
+    )
+    onnx_preds = predict(sess, X_test, onnx_settings.batch_size).reshape(len(X_test), len(UCI_TARGETS))
 
-    onnx_preds = sess.run(
-        None, {input_name: X_test.to_numpy().astype(np.float32)}
-    )[0].ravel()
+    maes = [masked_mae(Y_test[:, i], onnx_preds[:, i]) for i in range(len(UCI_TARGETS))]
+    _log_and_plot_targets(Y_test, onnx_preds, maes, plot_out, dpi)
 
-    mae_onnx = mean_absolute_error(y_test.to_numpy(), onnx_preds)
-    logger.info("UCI MAE (onnxruntime): %.4f", mae_onnx)
 
-    # 8) Visualization (Actual vs Predicted)
-    plot_out.parent.mkdir(parents=True, exist_ok=True)
-    # Visualization 1: Actual vs Predicted (with MAE and y=x line)
-    plot_actual_vs_predicted(
-        y_true=y_test.to_numpy(),
-        y_pred=onnx_preds,
-        out_path=plot_out,
-        mae=mae_onnx,
-        title="UCI Air Quality: Actual vs Predicted (ONNXRuntime)",
-    )
+def _run_uci_pipeline_chunked(
+    uci_csv: Path,
+    onnx_out: Path,
+    plot_out: Path,
+    onnx_settings: ONNXSettings,
+    dpi: int,
+    chunk_size: int,
+) -> None:
+    """
+    Bounded-memory variant: the CSV is streamed in float32 blocks twice,
+    once to accumulate the normal equations and once to score held-out rows
+    with onnxruntime. Only a capped sample of test rows is kept for plots.
+    """
+    source = partial(iter_uci_blocks, uci_csv, chunk_size)
+
+    merged = fit_chunked(source, n_features=len(UCI_SENSOR_FEATURES), n_targets=len(UCI_TARGETS))
+
+    export_sklearn_onnx(merged, onnx_out)
+    logger.info("ONNX exported: %s", onnx_out)
 
-    # Visualization 2: Prediction error histogram
-    error_plot_path = plot_out.parent / "uci_prediction_error_hist.png"
-    plot_error_histogram(
-        y_true=y_test.to_numpy(),
-        y_pred=onnx_preds,
-        out_path=error_plot_path,
+    result = evaluate_onnx_chunked(
+        source, onnx_out, n_targets=len(UCI_TARGETS), onnx_settings=onnx_settings
     )
+    _log_and_plot_targets(result.y_true_sample, result.y_pred_sample, result.mae, plot_out, dpi)
+
 
-    logger.info("Visualization saved: %s", plot_out)
-    logger.info("Error histogram saved: %s", error_plot_path)
+def _log_and_plot_targets(
+    Y_true: np.ndarray,
+    Y_pred: np.ndarray,
+    maes: list[float],
+    plot_out: Path,
+    dpi: int,
+) -> None:
+    plot_out.parent.mkdir(parents=True, exist_ok=True)
 
+    for i, target in enumerate(UCI_TARGETS):
+        mask = ~np.isnan(Y_true[:, i])
+        y_true = Y_true[mask, i]
+        y_pred = Y_pred[mask, i]
+
+        mae_onnx = maes[i]
+        logger.info("UCI %s MAE (onnxruntime): %.4f", target, mae_onnx)
+
+        if not mask.any():
+            logger.warning("No test rows with %s available for plotting", target)
+            continue
+
+        # CO keeps the original output names; other targets get a suffix
+        if target == "CO(GT)":
+            scatter_path = plot_out
+            error_plot_path = plot_out.parent / "uci_prediction_error_hist.png"
+        else:
+            slug = _target_slug(target)
+            scatter_path = plot_out.with_name(f"{plot_out.stem}_{slug}{plot_out.suffix}")
+            error_plot_path = plot_out.parent / f"uci_prediction_error_hist_{slug}.png"
+
+        # 8) Visualization 1: Actual vs Predicted (with MAE and y=x line)
+        plot_actual_vs_predicted(
+            y_true=y_true,
+            y_pred=y_pred,
+            out_path=scatter_path,
+            mae=mae_onnx,
+            title=f"UCI Air Quality: {target} Actual vs Predicted (ONNXRuntime)",
+            target=target,
+            dpi=dpi,
+        )
+
+        # Visualization 2: Prediction error histogram
+        plot_error_histogram(
+            y_true=y_true,
+            y_pred=y_pred,
+            out_path=error_plot_path,
+            dpi=dpi,
+        )
+
+        logger.info("Visualization saved: %s", scatter_path)
+        logger.info("Error histogram saved: %s", error_plot_path)
@@ -1,8 +1,12 @@
+from __future__ import annotations
+
 import sqlite3
 from pathlib import Path
-from typing import Iterable, Any
+from typing import Callable, Iterable, Any
 from dataclasses import dataclass
 
+from src.config.settings import SQLiteSettings
+
 @dataclass
 class AQIRecord:
     city: str
@@ -15,16 +19,46 @@ class AQIRecord:
     o3: float
     timestamp: str
 
+@dataclass
+class PollutantStats:
+    """Incremental (Welford) statistics for one city/pollutant stream."""
+    city: str
+    pollutant: str
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    last_value: float | None = None
+    repeat_count: int = 0
+    updated_at: str | None = None
+
+@dataclass
+class AnomalyFlag:
+    city: str
+    pollutant: str
+    kind: str  # "spike" | "stuck" | "impossible"
+    value: float
+    score: float | None
+    timestamp: str
+
+# (persisted stats, new records) -> (changed stats, flags)
+DetectFn = Callable[
+    [dict[tuple[str, str], "PollutantStats"], list[AQIRecord]],
+    tuple[list["PollutantStats"], list["AnomalyFlag"]],
+]
+
 class SQLiteStorage:
     """SQLite persistence layer for AQI data."""
     
-    def __init__(self, db_path: Path) -> None:
+    def __init__(self, db_path: Path, settings: SQLiteSettings = SQLiteSettings()) -> None:
         self.db_path = db_path
+        self.settings = settings
         self._init_db()  # Initialize database on object creation
 
     def _connect(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_path)
-        conn.execute("PRAGMA journal_mode=WAL;")
+        conn = sqlite3.connect(self.db_path, timeout=self.settings.busy_timeout)
+        conn.execute(f"PRAGMA journal_mode={self.settings.journal_mode.upper()};")
+        conn.execute(f"PRAGMA synchronous={self.settings.synchronous.upper()};")
+        conn.execute(f"PRAGMA cache_size={int(self.settings.cache_size)};")
         conn.execute("PRAGMA foreign_keys=ON;")
         return conn
 
@@ -47,26 +81,79 @@ class SQLiteStorage:
                 );
                 """
             )
+            self._ensure_unique_readings(conn)
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS aqi_stream_stats (
+                    city TEXT NOT NULL,
+                    pollutant TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    mean REAL NOT NULL,
+                    m2 REAL NOT NULL,
+                    last_value REAL,
+                    repeat_count INTEGER NOT NULL,
+                    updated_at TEXT,
+                    PRIMARY KEY (city, pollutant)
+                );
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS aqi_anomalies (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    city TEXT NOT NULL,
+                    pollutant TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    value REAL,
+                    score REAL,
+                    timestamp TEXT NOT NULL
+                );
+                """
+            )
 
-    def insert_many(self, records: Iterable[AQIRecord]) -> int:
-        """Inserts multiple records into the aqi_readings table."""
-        rows = [
-            (r.city, r.aqi, r.pm25, r.pm10, r.co, r.no2, r.so2, r.o3, r.timestamp)
-            for r in records
-        ]
-        if not rows:
-            return 0
+    @staticmethod
+    def _ensure_unique_readings(conn: sqlite3.Connection) -> None:
+        """
+        One row per (city, station timestamp): a re-polled measurement is not stored twice.
+        Databases created before the index existed are de-duplicated first (oldest row kept).
+        """
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'uq_aqi_readings_city_ts'"
+        ).fetchone()
+        if exists:
+            return
 
-        with self._connect() as conn:
-            cur = conn.executemany(
+        conn.execute(
+            """
+            DELETE FROM aqi_readings
+            WHERE id NOT IN (SELECT MIN(id) FROM aqi_readings GROUP BY city, timestamp)
+            """
+        )
+        conn.execute(
+            "CREATE UNIQUE INDEX uq_aqi_readings_city_ts ON aqi_readings(city, timestamp)"
+        )
+
+    @staticmethod
+    def _insert_readings(conn: sqlite3.Connection, records: Iterable[AQIRecord]) -> list[AQIRecord]:
+        """Inserts records, skipping ones already stored; returns the records actually inserted."""
+        inserted: list[AQIRecord] = []
+        for r in records:
+            cur = conn.execute(
                 """
-                INSERT INTO aqi_readings
+                INSERT OR IGNORE INTO aqi_readings
                 (city, aqi, pm25, pm10, co, no2, so2, o3, timestamp)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, 
-                rows
+                """,
+                (r.city, r.aqi, r.pm25, r.pm10, r.co, r.no2, r.so2, r.o3, r.timestamp)
             )
-            return cur.rowcount
+            if cur.rowcount == 1:
+                inserted.append(r)
+        return inserted
+
+    def insert_many(self, records: Iterable[AQIRecord]) -> int:
+        """Inserts multiple records into the aqi_readings table, ignoring duplicates."""
+        with self._connect() as conn:
+            return len(self._insert_readings(conn, records))
 
     def fetch_latest_per_city(self) -> list[dict[str, Any]]:
         """Fetch the latest AQI readings per city from the database."""
@@ -85,3 +172,77 @@ class SQLiteStorage:
             cur = conn.execute(q)
             cols = [d[0] for d in cur.description]
             return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+    @staticmethod
+    def _read_stream_stats(conn: sqlite3.Connection) -> dict[tuple[str, str], PollutantStats]:
+        rows = conn.execute(
+            """
+            SELECT city, pollutant, count, mean, m2, last_value, repeat_count, updated_at
+            FROM aqi_stream_stats;
+            """
+        ).fetchall()
+        return {(r[0], r[1]): PollutantStats(*r) for r in rows}
+
+    def fetch_stream_stats(self) -> dict[tuple[str, str], PollutantStats]:
+        """Load the persisted per-city, per-pollutant running statistics."""
+        with self._connect() as conn:
+            return self._read_stream_stats(conn)
+
+    def insert_with_anomalies(
+        self,
+        records: Iterable[AQIRecord],
+        detect: DetectFn,
+    ) -> tuple[int, list[AnomalyFlag]]:
+        """
+        Inserts readings, updates running statistics and stores anomaly flags
+        in one IMMEDIATE transaction: a crash never leaves readings that were not
+        counted in the stats, and concurrent runs serialize instead of
+        overwriting each other's stats. Readings already stored (same city and
+        station timestamp) are skipped and never passed to `detect`.
+        """
+        conn = self._connect()
+        conn.isolation_level = None  # explicit transaction control
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            inserted = self._insert_readings(conn, records)
+            # Only new measurements reach the detector. Stats are read under the
+            # write lock, so no other run can change them meanwhile.
+            changed, flags = detect(self._read_stream_stats(conn), inserted)
+
+            if changed:
+                conn.executemany(
+                    """
+                    INSERT INTO aqi_stream_stats
+                    (city, pollutant, count, mean, m2, last_value, repeat_count, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(city, pollutant) DO UPDATE SET
+                        count=excluded.count,
+                        mean=excluded.mean,
+                        m2=excluded.m2,
+                        last_value=excluded.last_value,
+                        repeat_count=excluded.repeat_count,
+                        updated_at=excluded.updated_at
+                    """,
+                    [
+                        (s.city, s.pollutant, s.count, s.mean, s.m2, s.last_value, s.repeat_count, s.updated_at)
+                        for s in changed
+                    ]
+                )
+            if flags:
+                conn.executemany(
+                    """
+                    INSERT INTO aqi_anomalies
+                    (city, pollutant, kind, value, score, timestamp)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    [(f.city, f.pollutant, f.kind, f.value, f.score, f.timestamp) for f in flags]
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        return len(inserted), flags
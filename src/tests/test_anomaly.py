@@ -0,0 +1,203 @@
+import sqlite3
+import statistics
+from functools import partial
+
+import pytest
+
+from src.config.settings import AnomalySettings
+from src.pipeline.anomaly import AnomalyDetector, detect_anomalies, stddev
+from src.storage.sqlite_storage import AQIRecord, SQLiteStorage
+
+
+def ts(i: int) -> str:
+    return f"2024-01-01T{i // 60:02d}:{i % 60:02d}:00"
+
+
+def feed(detector, values, city="tehran", pollutant="aqi", start=0):
+    flags = []
+    for i, v in enumerate(values, start=start):
+        flags.extend(detector.observe(city, pollutant, v, ts(i)))
+    return flags
+
+
+def record(i: int, aqi: float, city: str = "tehran") -> AQIRecord:
+    return AQIRecord(
+        city=city, aqi=aqi, pm25=None, pm10=None, co=None,
+        no2=None, so2=None, o3=None, timestamp=ts(i),
+    )
+
+
+def test_welford_matches_statistics_module():
+    values = [42.0, 57.5, 61.0, 38.25, 90.0, 12.0, 55.0, 47.5, 70.0, 33.0]
+    detector = AnomalyDetector()
+    feed(detector, values)
+
+    stats = detector.state[("tehran", "aqi")]
+    assert stats.count == len(values)
+    assert stats.mean == pytest.approx(statistics.mean(values))
+    assert stddev(stats) ** 2 == pytest.approx(statistics.variance(values))
+
+
+def test_spike_threshold_boundary():
+    settings = AnomalySettings(z_threshold=3.0, min_samples=10)
+    history = [50.0, 52.0, 48.0, 51.0, 49.0, 53.0, 47.0, 50.0, 52.0, 48.0]
+
+    detector = AnomalyDetector(settings=settings)
+    feed(detector, history)
+    stats = detector.state[("tehran", "aqi")]
+    limit = settings.z_threshold * stddev(stats)
+
+    # Just inside the threshold: no spike
+    below = AnomalyDetector(settings=settings)
+    feed(below, history)
+    assert feed(below, [stats.mean + limit * 0.999], start=len(history)) == []
+
+    # Just outside the threshold: spike with the z-score as score
+    flags = feed(detector, [stats.mean + limit * 1.001], start=len(history))
+    assert [f.kind for f in flags] == ["spike"]
+    assert flags[0].score == pytest.approx(settings.z_threshold * 1.001)
+
+
+def test_no_spike_before_min_samples():
+    settings = AnomalySettings(min_samples=10)
+    detector = AnomalyDetector(settings=settings)
+
+    flags = feed(detector, [50.0, 52.0, 48.0, 51.0, 49.0, 53.0, 47.0, 50.0, 52.0, 900.0])
+
+    assert [f for f in flags if f.kind == "spike"] == []
+
+
+def test_stuck_flagged_once_at_threshold():
+    detector = AnomalyDetector(settings=AnomalySettings(stuck_repeats=3))
+
+    assert feed(detector, [40.0, 41.0, 41.0]) == []
+    flags = feed(detector, [41.0], start=3)
+    assert [(f.kind, f.score) for f in flags] == [("stuck", 3.0)]
+
+    # Further identical readings do not flood the flag table
+    assert feed(detector, [41.0, 41.0, 41.0], start=4) == []
+
+    # A new run after the value changes is flagged again
+    flags = feed(detector, [44.0, 44.0, 44.0], start=7)
+    assert [f.kind for f in flags] == ["stuck"]
+
+
+@pytest.mark.parametrize("value, impossible", [(-0.5, True), (0.0, False), (500.0, False), (500.5, True)])
+def test_impossible_value_boundaries(value, impossible):
+    detector = AnomalyDetector(settings=AnomalySettings(max_value=500.0))
+
+    flags = feed(detector, [value])
+
+    assert [f.kind for f in flags] == (["impossible"] if impossible else [])
+    # Impossible readings never enter the statistics
+    assert detector.state[("tehran", "aqi")].count == (0 if impossible else 1)
+
+
+def test_repolled_measurement_is_ignored():
+    detector = AnomalyDetector(settings=AnomalySettings(stuck_repeats=2))
+
+    assert detector.observe("tehran", "aqi", 80.0, ts(0)) == []
+    # Same station timestamp polled again: not counted, not a stuck repeat
+    assert detector.observe("tehran", "aqi", 80.0, ts(0)) == []
+    assert detector.observe("tehran", "aqi", -1.0, ts(0)) == []
+
+    stats = detector.state[("tehran", "aqi")]
+    assert stats.count == 1
+    assert stats.repeat_count == 1
+
+
+def test_state_persists_and_resumes_without_history(tmp_path):
+    db = tmp_path / "aqi.sqlite"
+    settings = AnomalySettings(min_samples=10, z_threshold=3.0)
+    detect = partial(detect_anomalies, settings=settings)
+    history = [50.0, 52.0, 48.0, 51.0, 49.0, 53.0, 47.0, 50.0, 52.0, 48.0]
+
+    storage = SQLiteStorage(db)
+    inserted, flags = storage.insert_with_anomalies(
+        [record(i, v) for i, v in enumerate(history)], detect
+    )
+    assert inserted == len(history)
+    assert flags == []
+
+    # Detection must not depend on the stored readings
+    with sqlite3.connect(db) as conn:
+        conn.execute("DELETE FROM aqi_readings")
+
+    # "Restart": a fresh storage object reloads only the running stats
+    restarted = SQLiteStorage(db)
+    stats = restarted.fetch_stream_stats()[("tehran", "aqi")]
+    assert stats.count == len(history)
+    assert stats.mean == pytest.approx(statistics.mean(history))
+
+    _, flags = restarted.insert_with_anomalies([record(len(history), 300.0)], detect)
+    assert [f.kind for f in flags] == ["spike"]
+
+    # Re-polling the same measurement after restart changes nothing
+    _, flags = restarted.insert_with_anomalies([record(len(history), 300.0)], detect)
+    assert flags == []
+    assert restarted.fetch_stream_stats()[("tehran", "aqi")].count == len(history) + 1
+
+    with sqlite3.connect(db) as conn:
+        rows = conn.execute("SELECT city, pollutant, kind FROM aqi_anomalies").fetchall()
+    assert rows == [("tehran", "aqi", "spike")]
+
+
+def test_failed_detection_rolls_back_insert(tmp_path):
+    storage = SQLiteStorage(tmp_path / "aqi.sqlite")
+
+    def broken(stats, records):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        storage.insert_with_anomalies([record(0, 50.0)], broken)
+
+    assert storage.fetch_latest_per_city() == []
+    assert storage.fetch_stream_stats() == {}
+
+
+def test_repeated_inserts_keep_one_row_per_measurement(tmp_path):
+    storage = SQLiteStorage(tmp_path / "aqi.sqlite")
+    seen = []
+
+    def detect(stats, records):
+        seen.append([r.city for r in records])
+        return [], []
+
+    batch = [record(0, 50.0), record(0, 70.0, city="isfahan")]
+    for _ in range(3):
+        storage.insert_with_anomalies(batch, detect)
+    assert storage.insert_many(batch) == 0
+
+    # Only the first call saw new measurements
+    assert seen == [["tehran", "isfahan"], [], []]
+
+    latest = storage.fetch_latest_per_city()
+    assert [(r["city"], r["aqi"]) for r in latest] == [("isfahan", 70.0), ("tehran", 50.0)]
+    with sqlite3.connect(storage.db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM aqi_readings").fetchone() == (2,)
+
+
+def test_existing_database_is_deduplicated(tmp_path):
+    db = tmp_path / "old.sqlite"
+    with sqlite3.connect(db) as conn:
+        conn.execute(
+            """
+            CREATE TABLE aqi_readings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                city TEXT NOT NULL,
+                aqi REAL, pm25 REAL, pm10 REAL, co REAL, no2 REAL, so2 REAL, o3 REAL,
+                timestamp TEXT NOT NULL
+            )
+            """
+        )
+        conn.executemany(
+            "INSERT INTO aqi_readings (city, aqi, timestamp) VALUES (?, ?, ?)",
+            [("tehran", 50.0, ts(0)), ("tehran", 50.0, ts(0)), ("tehran", 55.0, ts(1))],
+        )
+
+    storage = SQLiteStorage(db)
+
+    assert [r["aqi"] for r in storage.fetch_latest_per_city()] == [55.0]
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM aqi_readings").fetchone() == (2,)
+    assert storage.insert_many([record(1, 55.0)]) == 0
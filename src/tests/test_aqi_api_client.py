@@ -0,0 +1,23 @@
+from src.data_loader.aqi_api_client import AQIAPIClient
+
+
+def parse(raw):
+    return AQIAPIClient(api_token="test")._parse_response("tehran", raw)
+
+
+def test_timestamp_is_station_time_in_utc():
+    raw = {"aqi": 80, "iaqi": {}, "time": {"s": "2024-01-01 12:00:00", "tz": "+03:30", "iso": "2024-01-01T12:00:00+03:30"}}
+
+    assert parse(raw)["timestamp"] == "2024-01-01T08:30:00"
+
+
+def test_timestamp_falls_back_to_s_and_tz():
+    raw = {"aqi": 80, "iaqi": {}, "time": {"s": "2024-01-01 12:00:00", "tz": "+03:30"}}
+
+    assert parse(raw)["timestamp"] == "2024-01-01T08:30:00"
+
+
+def test_timestamp_falls_back_to_fetch_time():
+    raw = {"aqi": 80, "iaqi": {}}
+
+    assert parse(raw)["timestamp"] > "2024"
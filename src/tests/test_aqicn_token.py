@@ -5,7 +5,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 token = os.getenv('AQICN_API_TOKEN')
-print("Token:", token)
+print("Token:", "set" if token else "missing")
 
 city = "tehran"
 url = f"https://api.waqi.info/feed/{city}/?token={token}"
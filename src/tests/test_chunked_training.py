@@ -0,0 +1,184 @@
+from functools import partial
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from src.data_loader.uci_loader import UCI_SENSOR_FEATURES, UCI_TARGETS, iter_uci_blocks
+from src.ml.chunked_training import (
+    NormalEquationAccumulator,
+    evaluate_onnx_chunked,
+    fit_chunked,
+)
+from src.ml.onnx_session import export_sklearn_onnx
+from src.ml.train_aqicn_model import FEATURE_COLS, iter_aqicn_blocks, train_and_export_aqicn_model
+from src.storage.sqlite_storage import AQIRecord, SQLiteStorage
+
+
+def correlated_sensors(n: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    # PT08-like inputs: ~1e3 in magnitude and strongly correlated
+    rng = np.random.default_rng(seed)
+    base = rng.normal(1000.0, 150.0, size=n)
+    X = np.column_stack([base * s + rng.normal(0, 20, n) for s in (1.0, 0.9, 1.1, 1.4, 0.8)])
+    coef = np.array([[0.004, -0.001, 0.002, 0.0005, 0.001], [0.2, 0.1, -0.05, 0.3, 0.01]])
+    Y = X @ coef.T + np.array([-3.0, 40.0]) + rng.normal(0, 0.5, size=(n, 2))
+    return X.astype(np.float32), Y.astype(np.float32)
+
+
+def test_accumulator_matches_linear_regression():
+    X, Y = correlated_sensors(2_000)
+    Y[::7, 1] = np.nan  # targets with their own missing rows
+
+    acc = NormalEquationAccumulator(n_features=X.shape[1], n_targets=2)
+    for start in range(0, len(X), 333):
+        acc.partial_fit(X[start:start + 333], Y[start:start + 333])
+    model = acc.to_model()
+
+    for t in range(2):
+        mask = ~np.isnan(Y[:, t])
+        ref = LinearRegression().fit(X[mask].astype(float), Y[mask, t].astype(float))
+        np.testing.assert_allclose(model.coef_[t], ref.coef_, rtol=1e-6, atol=1e-9)
+        assert model.intercept_[t] == pytest.approx(ref.intercept_, rel=1e-6)
+
+
+def test_accumulator_single_target_shapes():
+    X, Y = correlated_sensors(200)
+    acc = NormalEquationAccumulator(n_features=X.shape[1], n_targets=1)
+    acc.partial_fit(X, Y[:, :1])
+    model = acc.to_model()
+
+    assert model.coef_.shape == (X.shape[1],)
+    assert isinstance(model.intercept_, float)
+
+
+def test_accumulator_requires_rows_per_target():
+    acc = NormalEquationAccumulator(n_features=2, n_targets=2)
+    acc.partial_fit(np.ones((3, 2), np.float32), np.array([[1, np.nan]] * 3, np.float32))
+
+    with pytest.raises(ValueError):
+        acc.to_model()
+
+
+@pytest.fixture
+def uci_csv(tmp_path):
+    X, Y2 = correlated_sensors(600, seed=1)
+    rng = np.random.default_rng(2)
+    Y = np.column_stack([Y2[:, 0], Y2[:, 1], Y2[:, 0] * 3, Y2[:, 1] * 2, Y2[:, 1] / 2])
+
+    header = ["Date", "Time", "CO(GT)", "PT08.S1(CO)", "NMHC(GT)", "C6H6(GT)", "PT08.S2(NMHC)",
+              "NOx(GT)", "PT08.S3(NOx)", "NO2(GT)", "PT08.S4(NO2)", "PT08.S5(O3)", "T", "RH", "AH", "", ""]
+    cols = dict(zip(UCI_SENSOR_FEATURES, X.T))
+    cols.update(zip(UCI_TARGETS, Y.T))
+
+    lines = [";".join(header)]
+    for i in range(len(X)):
+        row = {"Date": "10/03/2004", "Time": "18.00.00", "T": "13,6", "RH": "48,9", "AH": "0,7578"}
+        for name, values in cols.items():
+            row[name] = f"{values[i]:.4f}".replace(".", ",")
+        if rng.random() < 0.1:
+            row["NOx(GT)"] = "-200"  # UCI missing sentinel
+        lines.append(";".join(row.get(h, "") for h in header))
+
+    lines[50] = lines[50].replace(lines[50].split(";")[3], "n/a", 1)  # malformed feature cell
+    lines[80] = lines[80].replace(lines[80].split(";")[2], "??", 1)  # malformed target cell
+    lines.append(";;;;;;;;;;;;;;;;")  # trailing empty row as in the real file
+
+    path = tmp_path / "uci.csv"
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+@pytest.mark.parametrize("chunk_size", [7, 64, 10_000])
+def test_chunked_uci_fit_is_independent_of_chunk_size(uci_csv, tmp_path, chunk_size):
+    reference = fit_chunked(
+        partial(iter_uci_blocks, uci_csv, 10_000), len(UCI_SENSOR_FEATURES), len(UCI_TARGETS)
+    )
+    source = partial(iter_uci_blocks, uci_csv, chunk_size)
+
+    model = fit_chunked(source, len(UCI_SENSOR_FEATURES), len(UCI_TARGETS))
+    np.testing.assert_allclose(model.coef_, reference.coef_, rtol=1e-6, atol=1e-9)
+    np.testing.assert_allclose(model.intercept_, reference.intercept_, rtol=1e-6, atol=1e-9)
+
+    onnx_path = tmp_path / f"uci_{chunk_size}.onnx"
+    export_sklearn_onnx(model, onnx_path)
+    result = evaluate_onnx_chunked(source, onnx_path, n_targets=len(UCI_TARGETS), sample_size=25)
+
+    # Recompute MAE in memory over the same held-out rows
+    blocks = list(source())
+    X = np.concatenate([b[0] for b in blocks])
+    Y = np.concatenate([b[1] for b in blocks])
+    is_test = np.random.default_rng(42).random(len(X)) < 0.2
+    preds = model.predict(X[is_test])
+    for t in range(len(UCI_TARGETS)):
+        valid = ~np.isnan(Y[is_test, t])
+        expected = np.abs(preds[valid, t] - Y[is_test][valid, t]).mean()
+        assert result.mae[t] == pytest.approx(expected, rel=1e-4)
+
+    assert result.y_true_sample.shape == (25, len(UCI_TARGETS))
+    assert result.y_pred_sample.shape == (25, len(UCI_TARGETS))
+
+
+def test_uci_blocks_coerce_malformed_cells(uci_csv):
+    X = np.concatenate([b[0] for b in iter_uci_blocks(uci_csv, 100)])
+    Y = np.concatenate([b[1] for b in iter_uci_blocks(uci_csv, 100)])
+
+    # Row with the malformed feature and the trailing empty row are dropped
+    assert len(X) == 599
+    assert X.dtype == np.float32
+    assert not np.isnan(X).any()
+    assert np.isnan(Y[:, 0]).sum() == 1  # malformed target became NaN
+    assert not (Y == -200).any()
+
+
+def test_plot_sample_covers_whole_stream(tmp_path):
+    # Time-ordered targets: a first-rows sample would only see small values
+    n = 5_000
+    X = np.arange(n, dtype=np.float32).reshape(-1, 1)
+    Y = X.copy()
+
+    def source():
+        for start in range(0, n, 100):
+            yield X[start:start + 100], Y[start:start + 100]
+
+    model = fit_chunked(source, n_features=1, n_targets=1)
+    onnx_path = tmp_path / "ramp.onnx"
+    export_sklearn_onnx(model, onnx_path)
+
+    result = evaluate_onnx_chunked(source, onnx_path, n_targets=1, sample_size=50)
+
+    sample = result.y_true_sample[:, 0]
+    assert len(sample) == 50
+    assert sample.min() < n * 0.25
+    assert sample.max() > n * 0.75
+
+
+@pytest.fixture
+def aqicn_db(tmp_path):
+    rng = np.random.default_rng(3)
+    storage = SQLiteStorage(tmp_path / "aqi.sqlite")
+    records = []
+    for i in range(400):
+        feats = rng.uniform(5, 150, size=len(FEATURE_COLS))
+        aqi = float(feats @ np.array([0.8, 0.3, 0.1, 0.2, 0.05, 0.1]) + 5 + rng.normal(0, 1))
+        values = dict(zip(FEATURE_COLS, map(float, feats)))
+        if i % 25 == 0:
+            values["so2"] = None  # incomplete rows are skipped
+        records.append(AQIRecord(city="tehran", aqi=aqi, timestamp=f"t{i:04d}", **values))
+    storage.insert_many(records)
+    return storage.db_path
+
+
+@pytest.mark.parametrize("chunk_size", [1, 33, 1_000])
+def test_chunked_aqicn_fit_is_independent_of_chunk_size(aqicn_db, tmp_path, chunk_size):
+    reference = fit_chunked(partial(iter_aqicn_blocks, aqicn_db, 1_000), len(FEATURE_COLS), 1)
+
+    model = fit_chunked(partial(iter_aqicn_blocks, aqicn_db, chunk_size), len(FEATURE_COLS), 1)
+
+    np.testing.assert_allclose(model.coef_, reference.coef_, rtol=1e-6, atol=1e-9)
+    assert model.intercept_ == pytest.approx(reference.intercept_, rel=1e-6)
+
+    blocks = list(iter_aqicn_blocks(aqicn_db, chunk_size))
+    assert sum(len(b[0]) for b in blocks) == 400 - 16
+
+    mae = train_and_export_aqicn_model(aqicn_db, tmp_path / "aqicn.onnx", chunk_size=chunk_size)
+    assert mae < 2.0
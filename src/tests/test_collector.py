@@ -0,0 +1,56 @@
+import threading
+import time
+
+from src.pipeline.collector import collect_records
+
+
+class FakeClient:
+    """Returns canned readings; slower for earlier cities so threads finish out of order."""
+
+    def __init__(self, cities: list[str], failing: set[str]) -> None:
+        self.delays = {c: 0.01 * (len(cities) - i) for i, c in enumerate(cities)}
+        self.failing = failing
+        self.threads: set[int] = set()
+
+    def fetch_city_aqi(self, city: str) -> dict:
+        self.threads.add(threading.get_ident())
+        time.sleep(self.delays[city])
+        if city in self.failing:
+            raise RuntimeError(f"API returned error for city '{city}'")
+        return {
+            "aqi": str(len(city) * 10),
+            "pm25": len(city),
+            "pm10": "-",
+            "co": None,
+            "no2": 1.5,
+            "so2": 2,
+            "o3": 3,
+            "timestamp": f"2024-01-01T00:00:{len(city):02d}",
+        }
+
+
+CITIES = ["tehran", "isfahan", "mashhad", "ahvaz", "shiraz"]
+
+
+def test_concurrent_collect_keeps_order_and_errors():
+    client = FakeClient(CITIES, failing={"mashhad"})
+
+    result = collect_records(client, CITIES, max_workers=4)
+
+    assert [r.city for r in result.records] == ["tehran", "isfahan", "ahvaz", "shiraz"]
+    assert result.errors == ["mashhad: API returned error for city 'mashhad'"]
+    assert len(client.threads) > 1
+
+    tehran = result.records[0]
+    assert tehran.aqi == 60.0
+    assert tehran.pm10 is None  # "-" from the API
+    assert tehran.co is None
+
+
+def test_concurrent_collect_matches_sequential():
+    failing = {"isfahan", "shiraz"}
+
+    sequential = collect_records(FakeClient(CITIES, failing), CITIES, max_workers=1)
+    concurrent = collect_records(FakeClient(CITIES, failing), CITIES, max_workers=8)
+
+    assert concurrent == sequential
@@ -0,0 +1,117 @@
+import os
+
+import pytest
+
+from src.config.settings import load_settings
+
+
+@pytest.fixture(autouse=True)
+def clean_env(tmp_path, monkeypatch):
+    # Settings resolve against the working directory and read AQI_* variables
+    for key in list(os.environ):
+        if key.startswith("AQI_") or key == "AQICN_API_TOKEN":
+            monkeypatch.delenv(key)
+    monkeypatch.chdir(tmp_path)
+
+
+def write_config(tmp_path, text):
+    (tmp_path / "aqi_pipeline.toml").write_text(text)
+
+
+def test_defaults_without_config(tmp_path):
+    settings = load_settings()
+
+    assert settings.data_dir == tmp_path / "data"
+    assert settings.http.timeout == 10.0
+    assert settings.sqlite.journal_mode == "WAL"
+    assert settings.onnx.providers == ("CPUExecutionProvider",)
+    assert settings.plots.dpi == 200
+    assert settings.cities == ["tehran", "isfahan", "mashhad", "ahvaz"]
+
+
+def test_toml_overrides_defaults_and_env_overrides_toml(tmp_path, monkeypatch):
+    write_config(tmp_path, """
+[http]
+timeout = 3.5
+
+[plots]
+dpi = 100
+
+[onnx]
+providers = ["CPUExecutionProvider"]
+intra_op_num_threads = 2
+
+[aqicn]
+cities = ["tehran"]
+
+[paths]
+data_dir = "custom"
+""")
+    monkeypatch.setenv("AQI_PLOTS_DPI", "300")
+    monkeypatch.setenv("AQI_AQICN_CITIES", "isfahan, mashhad")
+
+    settings = load_settings()
+
+    assert settings.http.timeout == 3.5  # TOML
+    assert settings.onnx.intra_op_num_threads == 2  # TOML
+    assert settings.plots.dpi == 300  # env wins over TOML
+    assert settings.cities == ["isfahan", "mashhad"]  # env wins over TOML
+    assert settings.collector.max_workers == 1  # default
+    assert settings.data_dir == tmp_path / "custom"
+    assert settings.plots_dir == tmp_path / "custom" / "plots"
+
+
+def test_explicit_config_path(tmp_path):
+    path = tmp_path / "other.toml"
+    path.write_text("[collector]\nmax_workers = 4\n")
+
+    assert load_settings(path).collector.max_workers == 4
+
+
+def test_missing_explicit_config_path_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_settings(tmp_path / "missing.toml")
+
+
+def test_unknown_section_rejected(tmp_path):
+    write_config(tmp_path, "[bogus]\nvalue = 1\n")
+
+    with pytest.raises(ValueError, match="Unknown settings section"):
+        load_settings()
+
+
+def test_unknown_key_rejected(tmp_path):
+    write_config(tmp_path, "[sqlite]\npage_size = 4096\n")
+
+    with pytest.raises(ValueError, match="Unknown setting"):
+        load_settings()
+
+
+@pytest.mark.parametrize(
+    "name, value",
+    [
+        ("AQI_SQLITE_JOURNAL_MODE", "bogus"),
+        ("AQI_SQLITE_JOURNAL_MODE", "WAL; DROP TABLE aqi_readings"),
+        ("AQI_SQLITE_SYNCHRONOUS", "sometimes"),
+        ("AQI_COLLECTOR_MAX_WORKERS", "0"),
+        ("AQI_COLLECTOR_MAX_WORKERS", "many"),
+        ("AQI_HTTP_TIMEOUT", "-1"),
+        ("AQI_PLOTS_DPI", "1.5"),
+        ("AQI_ANOMALY_ENABLED", "maybe"),
+    ],
+)
+def test_bad_env_values_rejected(monkeypatch, name, value):
+    monkeypatch.setenv(name, value)
+
+    with pytest.raises(ValueError):
+        load_settings()
+
+
+def test_token_not_in_repr(monkeypatch):
+    monkeypatch.setenv("AQICN_API_TOKEN", " super-secret-token ")
+
+    settings = load_settings()
+
+    assert settings.aqicn_api_token == "super-secret-token"
+    assert "super-secret-token" not in repr(settings)
+    assert "super-secret-token" not in str(settings)
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from src.ml.onnx_session import create_session, export_sklearn_onnx, predict
+from src.ml.train_uci_model import fit_uci_target_models
+
+TARGETS = ["CO(GT)", "NMHC(GT)", "C6H6(GT)", "NOx(GT)", "NO2(GT)"]
+
+
+@pytest.fixture
+def sensors_and_targets():
+    rng = np.random.default_rng(0)
+    n = 500
+    X = rng.normal(1000.0, 150.0, size=(n, 5))
+    coef = rng.normal(0, 0.1, size=(len(TARGETS), 5))
+    Y = X @ coef.T + rng.normal(0, 1.0, size=(n, len(TARGETS)))
+
+    # CO and C6H6 share their missing rows (one group); the others differ
+    shared = rng.random(n) < 0.1
+    Y[shared, 0] = np.nan
+    Y[shared, 2] = np.nan
+    Y[rng.random(n) < 0.8, 1] = np.nan  # NMHC(GT) is mostly empty
+    Y[rng.random(n) < 0.2, 3] = np.nan
+    return X, Y
+
+
+@pytest.mark.parametrize("max_workers", [1, 0, 3])
+def test_each_target_matches_its_own_fit(sensors_and_targets, max_workers):
+    X, Y = sensors_and_targets
+
+    merged = fit_uci_target_models(X, Y, TARGETS, max_workers=max_workers)
+
+    assert merged.coef_.shape == (len(TARGETS), X.shape[1])
+    assert merged.intercept_.shape == (len(TARGETS),)
+    for t in range(len(TARGETS)):
+        mask = ~np.isnan(Y[:, t])
+        ref = LinearRegression().fit(X[mask], Y[mask, t])
+        np.testing.assert_allclose(merged.coef_[t], ref.coef_, rtol=1e-9, atol=1e-12)
+        assert merged.intercept_[t] == pytest.approx(ref.intercept_, rel=1e-9)
+
+
+def test_target_without_rows_is_rejected(sensors_and_targets):
+    X, Y = sensors_and_targets
+    Y[:, 4] = np.nan
+
+    with pytest.raises(ValueError):
+        fit_uci_target_models(X, Y, TARGETS)
+
+
+def test_onnx_scores_all_targets_in_one_call(sensors_and_targets, tmp_path):
+    X, Y = sensors_and_targets
+    merged = fit_uci_target_models(X, Y, TARGETS)
+    path = tmp_path / "uci.onnx"
+
+    export_sklearn_onnx(merged, path)
+    sess = create_session(path)
+
+    assert sess.get_inputs()[0].shape[1] == 5
+    preds = predict(sess, X)
+    assert preds.shape == (len(X), len(TARGETS))
+
+    expected = merged.predict(X)
+    for t in range(len(TARGETS)):
+        # float32 graph vs float64 sklearn on inputs around 1e3
+        np.testing.assert_allclose(preds[:, t], expected[:, t], rtol=1e-4, atol=1e-2)
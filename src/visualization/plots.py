@@ -5,8 +5,9 @@ from pathlib import Path
 class PlotService:
     """Creates presentation-ready plots."""
 
-    def __init__(self, out_dir: Path) -> None:
+    def __init__(self, out_dir: Path, dpi: int = 200) -> None:
         self.out_dir = out_dir
+        self.dpi = dpi
         self.out_dir.mkdir(exist_ok=True)
 
     def plot_latest_aqi_bar(self, latest_rows: list[dict], filename: str = "latest_aqi.png") -> Path:
@@ -28,7 +29,7 @@ class PlotService:
 
         out_path = self.out_dir / filename
         plt.tight_layout()
-        plt.savefig(out_path, dpi=200)
+        plt.savefig(out_path, dpi=self.dpi)
         plt.close()
         return out_path
 
@@ -46,6 +47,6 @@ class PlotService:
 
         out_path = self.out_dir / filename
         plt.tight_layout()
-        plt.savefig(out_path, dpi=200)
+        plt.savefig(out_path, dpi=self.dpi)
         plt.close()
         return out_path
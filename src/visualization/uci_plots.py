@@ -11,6 +11,8 @@ def plot_actual_vs_predicted(
     out_path: Path,
     mae: float | None = None,
     title: str = "Actual vs Predicted",
+    target: str = "CO(GT)",
+    dpi: int = 200,
 ) -> None:
     """
     Scatter plot of Actual vs Predicted values with y=x reference line.
@@ -27,8 +29,8 @@ def plot_actual_vs_predicted(
     # Reference line y = x
     plt.plot([min_v, max_v], [min_v, max_v], "r--", label="Ideal (y = x)")
 
-    plt.xlabel("Actual CO(GT)")
-    plt.ylabel("Predicted CO(GT)")
+    plt.xlabel(f"Actual {target}")
+    plt.ylabel(f"Predicted {target}")
 
     if mae is not None:
         plt.title(f"{title}\nMAE = {mae:.4f}")
@@ -40,7 +42,7 @@ def plot_actual_vs_predicted(
 
     out_path.parent.mkdir(parents=True, exist_ok=True)
     plt.tight_layout()
-    plt.savefig(out_path, dpi=200)
+    plt.savefig(out_path, dpi=dpi)
     plt.close()
 
 
@@ -49,6 +51,7 @@ def plot_error_histogram(
     y_pred,
     out_path: Path,
     bins: int = 40,
+    dpi: int = 200,
 ) -> None:
     """
     Histogram of prediction errors (y_pred - y_true).
@@ -68,5 +71,5 @@ def plot_error_histogram(
 
     out_path.parent.mkdir(parents=True, exist_ok=True)
     plt.tight_layout()
-    plt.savefig(out_path, dpi=200)
+    plt.savefig(out_path, dpi=dpi)
     plt.close()